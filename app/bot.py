@@ -30,27 +30,35 @@ class BotApp:
     def __init__(self) -> None:
         self._config = load_config()
         self._db = Database(self._config.db_path)
+        # Joined with persisted /add_owner grants once the DB is open; extended by /add_owner
+        self._owner_id_set = self._config.owner_ids
+        self._start_owner_msg = (
+            "You are an owner. To store a video: 1) Send a video, 2) Reply to it with /remember <phrase>."
+        )
+        self._start_user_msg = (
+            f"Use inline: type @{self._config.bot_username or '<your_bot>'} <phrase> in any chat to get videos."
+        )
 
-    async def _ensure_db(self) -> None:
+    async def _ensure_db(self, application: Application) -> None:
+        self._config.data_dir.mkdir(parents=True, exist_ok=True)
         await self._db.init()
         await self._db.seed_owners(self._config.owner_ids)
+        # OWNER_IDS stays authoritative for seeded owners; /add_owner grants survive restarts
+        self._owner_id_set = self._config.owner_ids | await self._db.list_added_owner_ids()
+
+    async def _close_db(self, application: Application) -> None:
+        await self._db.close()
 
     def _is_owner(self, user_id: Optional[int]) -> bool:
-        return bool(user_id) and int(user_id) in set(self._config.owner_ids)
+        return user_id is not None and user_id in self._owner_id_set
 
     async def start_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         user = update.effective_user
         if not user:
             return
-        is_owner = self._is_owner(user.id)
-        if is_owner:
-            await update.effective_message.reply_text(
-                "You are an owner. To store a video: 1) Send a video, 2) Reply to it with /remember <phrase>."
-            )
-        else:
-            await update.effective_message.reply_text(
-                "Use inline: type @%s <phrase> in any chat to get videos." % (self._config.bot_username or "<your_bot>")
-            )
+        await update.effective_message.reply_text(
+            self._start_owner_msg if self._is_owner(user.id) else self._start_user_msg
+        )
 
     async def add_owner_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         user = update.effective_user
@@ -65,6 +73,7 @@ class BotApp:
             await update.effective_message.reply_text("Invalid user_id")
             return
         await self._db.add_owner(new_owner_id, None)
+        self._owner_id_set = self._owner_id_set | {new_owner_id}
         await update.effective_message.reply_text(f"Owner {new_owner_id} added.")
 
     async def status_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -87,9 +96,10 @@ class BotApp:
         offset = (page - 1) * page_size
         items = await self._db.list_mappings_paginated(limit=page_size, offset=offset)
         lines = [f"Page {page}/{max_page} — total {total}"]
-        for it in items:
-            owner = it.get("owner_username") or it.get("owner_user_id")
-            lines.append(f"{it['id']}. '{it['phrase']}' → {it['file_id']} (by {owner})")
+        lines.extend(
+            f"{it['id']}. '{it['phrase']}' → {it['file_id']} (by {it['owner_username'] or it['owner_user_id']})"
+            for it in items
+        )
         lines.append("\nUse /status <page> to navigate.")
         await update.effective_message.reply_text("\n".join(lines))
 
@@ -145,10 +155,18 @@ class BotApp:
         if not query:
             return
         items = await self._db.search(query, limit=10)
-        results = []
-        if not items:
+        results = [
+            InlineQueryResultCachedVideo(
+                id=str(it["id"]),
+                video_file_id=it["file_id"],
+                title=it["phrase"],
+                description=it["owner_username"] or str(it["owner_user_id"] or ""),
+            )
+            for it in items
+        ]
+        if not results:
             # Provide a hint result
-            results.append(
+            results = [
                 InlineQueryResultArticle(
                     id="noop",
                     title="No matches",
@@ -157,17 +175,7 @@ class BotApp:
                     ),
                     description="No saved videos match this phrase.",
                 )
-            )
-        else:
-            for it in items:
-                results.append(
-                    InlineQueryResultCachedVideo(
-                        id=str(it["id"]),
-                        video_file_id=it["file_id"],
-                        title=it["phrase"],
-                        description=it.get("owner_username") or str(it.get("owner_user_id") or ""),
-                    )
-                )
+            ]
         await update.inline_query.answer(results=results, cache_time=0, is_personal=True)
 
     async def on_error(self, update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -175,8 +183,6 @@ class BotApp:
 
     def run(self) -> None:
         logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
-        # Ensure DB is ready before starting polling
-        asyncio.run(self._ensure_db())
 
         # Ensure a current event loop exists for ApplicationBuilder on Python 3.8
         loop = asyncio.new_event_loop()
@@ -185,6 +191,9 @@ class BotApp:
         application: Application = (
             ApplicationBuilder()
             .token(self._config.bot_token)
+            # DB connections live on the polling loop, so open them there before polling starts
+            .post_init(self._ensure_db)
+            .post_shutdown(self._close_db)
             .build()
         )
         application.add_handler(CommandHandler("start", self.start_cmd))
@@ -196,7 +205,12 @@ class BotApp:
         application.add_error_handler(self.on_error)
 
         logger.info("Bot started")
-        application.run_polling(drop_pending_updates=True)
+        # Only commands (messages) and inline queries are handled; a long poll keeps idle traffic low
+        application.run_polling(
+            drop_pending_updates=True,
+            timeout=50,
+            allowed_updates=[Update.MESSAGE, Update.INLINE_QUERY],
+        )
 
 
 def main() -> None:
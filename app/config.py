@@ -1,33 +1,35 @@
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, Set
 
 
-@dataclass
+@dataclass(frozen=True)
 class Config:
     bot_token: str
-    owner_ids: List[int]
+    owner_ids: FrozenSet[int]
     db_path: Path
     data_dir: Path
     bot_username: str
 
 
-def _parse_owner_ids(raw: str) -> List[int]:
+def _parse_owner_ids(raw: str) -> FrozenSet[int]:
     if not raw:
-        return []
-    ids: List[int] = []
+        return frozenset()
+    ids: Set[int] = set()
     for piece in raw.split(","):
         piece = piece.strip()
         if not piece:
             continue
         try:
-            ids.append(int(piece))
+            ids.add(int(piece))
         except ValueError:
             continue
-    return ids
+    return frozenset(ids)
 
 
+@lru_cache(maxsize=1)
 def load_config() -> Config:
     token = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
     if not token:
@@ -35,7 +37,6 @@ def load_config() -> Config:
 
     data_dir = Path(os.getenv("DATA_DIR", "data")).resolve()
     db_path = Path(os.getenv("DB_PATH", str(data_dir / "bot.db"))).resolve()
-    data_dir.mkdir(parents=True, exist_ok=True)
 
     owner_ids = _parse_owner_ids(os.getenv("OWNER_IDS", ""))
     bot_username = os.getenv("BOT_USERNAME", "").strip()
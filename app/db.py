@@ -1,70 +1,299 @@
 import asyncio
-import datetime as dt
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import AsyncIterator, FrozenSet, Iterable, List, Optional, Set, Tuple
 
 import aiosqlite
 
 
+# Per-connection settings, re-applied to every connection right after it is opened.
+# journal_mode is persisted in the database file instead, so init() sets it once.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+_READER_POOL_SIZE = 4
+
+# Timestamps are unix seconds (UTC); {table} lets migrations build a copy under a new name
+_OWNERS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT,
+        added_at INTEGER NOT NULL,
+        added_via_command INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+_MAPPINGS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phrase TEXT NOT NULL,
+        file_id TEXT NOT NULL,
+        owner_user_id INTEGER,
+        owner_username TEXT,
+        created_at INTEGER NOT NULL,
+        phrase_lc TEXT COLLATE NOCASE
+    )
+"""
+
+_SEARCH_CACHE_SIZE = 512
+
+# RETURNING arrived in SQLite 3.35; Ubuntu 20.04's Python 3.8 still links 3.31
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_FTS_TOKEN_RE = re.compile(r"\w+")
+
+
+def _normalize(phrase: str) -> str:
+    return phrase.strip().lower()
+
+
+def _fts_query(q: str) -> str:
+    # q is already _normalize()d, as for the LIKE pattern builders below.
+    # Quote every token so user input can't inject FTS5 syntax, and prefix-match each one
+    return " ".join(f'"{token}"*' for token in _FTS_TOKEN_RE.findall(q))
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_prefix(q: str) -> str:
+    return _like_escape(q) + "%"
+
+
+def _like_subsequence(q: str) -> str:
+    # "lbstr" -> "%l%b%s%t%r%": matches phrases containing the characters in order
+    return "%" + "%".join(_like_escape(ch) for ch in q) + "%"
+
+
 class Database:
     def __init__(self, db_path: Path) -> None:
         self._db_path = db_path
-        self._lock = asyncio.Lock()
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._readers: Optional["asyncio.Queue[aiosqlite.Connection]"] = None
+        # Inline queries fire per keystroke, so identical searches repeat a lot
+        self._search_cache: "OrderedDict[Tuple[str, int], List[aiosqlite.Row]]" = OrderedDict()
+        self._cache_version = 0
+        # Owners change only via /add_owner, so membership is served from memory
+        self._owner_cache: Optional[Set[int]] = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self._db_path)
+        # Callers index rows by column name, so hand back sqlite rows rather than building dicts
+        conn.row_factory = aiosqlite.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._readers is None:
+            raise RuntimeError("Database.init() must be called first")
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def _writing(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._writer is None or self._write_lock is None:
+            raise RuntimeError("Database.init() must be called first")
+        # Writers share one connection, so each execute...commit sequence must run alone
+        async with self._write_lock:
+            yield self._writer
 
     async def init(self) -> None:
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
-        async with aiosqlite.connect(self._db_path) as db:
+        # Created here rather than in __init__ so it binds to the loop that runs the bot
+        self._write_lock = asyncio.Lock()
+        self._writer = await self._connect()
+        db = self._writer
+        # WAL lets the reader pool run alongside the writer and makes commits cheap
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute(_OWNERS_DDL.format(table="owners"))
+        await db.execute(_MAPPINGS_DDL.format(table="mappings"))
+        await self._migrate_phrase_lc(db)
+        await self._migrate_owner_source(db)
+        await self._migrate_timestamp_column(db, "owners", "added_at", _OWNERS_DDL)
+        await self._migrate_timestamp_column(db, "mappings", "created_at", _MAPPINGS_DDL)
+        # Timestamps are whole seconds, so id breaks ties to keep the newest-first order unique
+        await db.execute("DROP INDEX IF EXISTS idx_mappings_created")
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_mappings_created_id ON mappings (created_at DESC, id DESC)"
+        )
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_mappings_phrase_lc ON mappings (phrase_lc)")
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mappings_fts'"
+        ) as cur:
+            fts_exists = await cur.fetchone() is not None
+        await db.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS mappings_fts USING fts5(
+                phrase,
+                content='mappings',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        # Keep the external-content FTS index in sync with mappings
+        await db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS mappings_fts_ai AFTER INSERT ON mappings BEGIN
+                INSERT INTO mappings_fts (rowid, phrase) VALUES (new.id, new.phrase);
+            END
+            """
+        )
+        await db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS mappings_fts_ad AFTER DELETE ON mappings BEGIN
+                INSERT INTO mappings_fts (mappings_fts, rowid, phrase) VALUES ('delete', old.id, old.phrase);
+            END
+            """
+        )
+        await db.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS mappings_fts_au AFTER UPDATE OF phrase ON mappings BEGIN
+                INSERT INTO mappings_fts (mappings_fts, rowid, phrase) VALUES ('delete', old.id, old.phrase);
+                INSERT INTO mappings_fts (rowid, phrase) VALUES (new.id, new.phrase);
+            END
+            """
+        )
+        if not fts_exists:
+            # Index rows stored before the FTS table existed
+            await db.execute("INSERT INTO mappings_fts (mappings_fts) VALUES ('rebuild')")
+        async with db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_mappings_phrase_file_owner'"
+        ) as cur:
+            unique_exists = await cur.fetchone() is not None
+        if not unique_exists:
+            # Drop duplicates stored before the unique index existed, keeping the newest copy.
+            # Runs after the FTS triggers exist so the index forgets the removed rows too.
             await db.execute(
                 """
-                CREATE TABLE IF NOT EXISTS owners (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    added_at TEXT NOT NULL
+                DELETE FROM mappings WHERE id NOT IN (
+                    SELECT MAX(id) FROM mappings GROUP BY phrase, file_id, owner_user_id
                 )
                 """
             )
+            # The key includes the owner so each owner keeps (and can /delete) their own copy
+            await db.execute("DROP INDEX IF EXISTS uq_mappings_phrase_file")
             await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS mappings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    phrase TEXT NOT NULL,
-                    file_id TEXT NOT NULL,
-                    owner_user_id INTEGER,
-                    owner_username TEXT,
-                    created_at TEXT NOT NULL
-                )
-                """
+                "CREATE UNIQUE INDEX uq_mappings_phrase_file_owner ON mappings (phrase, file_id, owner_user_id)"
             )
-            await db.commit()
+        await db.commit()
+        async with db.execute("SELECT user_id FROM owners") as cur:
+            self._owner_cache = {int(r[0]) for r in await cur.fetchall()}
 
-    async def seed_owners(self, owner_ids: List[int]) -> None:
-        if not owner_ids:
+        # Readers are opened after the schema exists so they never see a half-built database
+        self._readers = asyncio.Queue()
+        for _ in range(_READER_POOL_SIZE):
+            self._readers.put_nowait(await self._connect())
+
+    @staticmethod
+    async def _migrate_phrase_lc(db: aiosqlite.Connection) -> None:
+        async with db.execute("PRAGMA table_info(mappings)") as cur:
+            columns = {r[1] for r in await cur.fetchall()}
+        if "phrase_lc" not in columns:
+            await db.execute("ALTER TABLE mappings ADD COLUMN phrase_lc TEXT COLLATE NOCASE")
+        # Backfilled in Python: SQLite's lower() only folds ASCII
+        async with db.execute("SELECT id, phrase FROM mappings WHERE phrase_lc IS NULL") as cur:
+            rows = await cur.fetchall()
+        if rows:
+            await db.executemany(
+                "UPDATE mappings SET phrase_lc = ? WHERE id = ?",
+                [(_normalize(r[1]), r[0]) for r in rows],
+            )
+
+    @staticmethod
+    async def _migrate_owner_source(db: aiosqlite.Connection) -> None:
+        async with db.execute("PRAGMA table_info(owners)") as cur:
+            columns = {r[1] for r in await cur.fetchall()}
+        # Existing rows can't be told apart, so they are treated as seeded from OWNER_IDS
+        if "added_via_command" not in columns:
+            await db.execute("ALTER TABLE owners ADD COLUMN added_via_command INTEGER NOT NULL DEFAULT 0")
+
+    @staticmethod
+    async def _migrate_timestamp_column(db: aiosqlite.Connection, table: str, column: str, ddl: str) -> None:
+        async with db.execute(f"PRAGMA table_info({table})") as cur:
+            info = await cur.fetchall()
+        columns = [r[1] for r in info]
+        if any(r[1] == column and r[2].upper() == "INTEGER" for r in info):
+            return
+        # Older databases stored ISO-8601 TEXT. A column's type can't be altered in place,
+        # so copy the rows into a table with the current schema and swap it in.
+        converted = ", ".join(
+            f"COALESCE(CAST(strftime('%s', {c}) AS INTEGER), 0)" if c == column else c for c in columns
+        )
+        await db.execute(ddl.format(table=f"{table}_new"))
+        await db.execute(
+            f"INSERT INTO {table}_new ({', '.join(columns)}) SELECT {converted} FROM {table}"
+        )
+        await db.execute(f"DROP TABLE {table}")
+        await db.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+    async def close(self) -> None:
+        if self._readers is not None:
+            while not self._readers.empty():
+                await self._readers.get_nowait().close()
+            self._readers = None
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def seed_owners(self, owner_ids: Iterable[int]) -> None:
+        ids = [int(oid) for oid in owner_ids]
+        if not ids:
             return
-        now = dt.datetime.utcnow().isoformat()
-        async with self._lock:
-            async with aiosqlite.connect(self._db_path) as db:
-                for oid in owner_ids:
-                    await db.execute(
-                        "INSERT OR IGNORE INTO owners (user_id, username, added_at) VALUES (?, ?, ?)",
-                        (int(oid), None, now),
-                    )
-                await db.commit()
+        now = int(time.time())
+        async with self._writing() as db:
+            await db.executemany(
+                "INSERT OR IGNORE INTO owners (user_id, username, added_at) VALUES (?, ?, ?)",
+                [(oid, None, now) for oid in ids],
+            )
+            await db.commit()
+            if self._owner_cache is not None:
+                self._owner_cache.update(ids)
 
     async def add_owner(self, user_id: int, username: Optional[str]) -> None:
-        now = dt.datetime.utcnow().isoformat()
-        async with self._lock:
-            async with aiosqlite.connect(self._db_path) as db:
-                await db.execute(
-                    "INSERT OR IGNORE INTO owners (user_id, username, added_at) VALUES (?, ?, ?)",
-                    (int(user_id), username, now),
-                )
-                await db.commit()
+        now = int(time.time())
+        async with self._writing() as db:
+            # A seeded owner granted via /add_owner keeps access once dropped from OWNER_IDS
+            await db.execute(
+                """
+                INSERT INTO owners (user_id, username, added_at, added_via_command) VALUES (?, ?, ?, 1)
+                ON CONFLICT (user_id) DO UPDATE SET added_via_command = 1
+                """,
+                (int(user_id), username, now),
+            )
+            await db.commit()
+            if self._owner_cache is not None:
+                self._owner_cache.add(int(user_id))
+
+    async def list_added_owner_ids(self) -> FrozenSet[int]:
+        # Only /add_owner grants are returned: seeded rows mirror OWNER_IDS, which stays authoritative
+        async with self._reader() as db:
+            async with db.execute("SELECT user_id FROM owners WHERE added_via_command = 1") as cur:
+                return frozenset(int(r[0]) for r in await cur.fetchall())
 
     async def is_owner(self, user_id: int) -> bool:
-        async with aiosqlite.connect(self._db_path) as db:
-            async with db.execute("SELECT 1 FROM owners WHERE user_id = ?", (int(user_id),)) as cur:
-                row = await cur.fetchone()
-                return row is not None
+        if self._owner_cache is None:
+            raise RuntimeError("Database.init() must be called first")
+        return int(user_id) in self._owner_cache
+
+    def _invalidate_search_cache(self) -> None:
+        self._cache_version += 1
+        self._search_cache.clear()
 
     async def add_mapping(
         self,
@@ -73,123 +302,128 @@ class Database:
         owner_user_id: Optional[int],
         owner_username: Optional[str],
     ) -> int:
-        now = dt.datetime.utcnow().isoformat()
-        async with self._lock:
-            async with aiosqlite.connect(self._db_path) as db:
-                cur = await db.execute(
-                    "INSERT INTO mappings (phrase, file_id, owner_user_id, owner_username, created_at) VALUES (?, ?, ?, ?, ?)",
-                    (phrase, file_id, owner_user_id, owner_username, now),
-                )
-                await db.commit()
-                return int(cur.lastrowid)
+        now = int(time.time())
+        # An owner re-remembering their own (phrase, video) pair just refreshes it
+        upsert = """
+            INSERT INTO mappings (phrase, file_id, owner_user_id, owner_username, created_at, phrase_lc)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (phrase, file_id, owner_user_id) DO UPDATE SET
+                created_at = excluded.created_at,
+                owner_username = excluded.owner_username
+        """
+        params = (phrase, file_id, owner_user_id, owner_username, now, _normalize(phrase))
+        async with self._writing() as db:
+            if _HAS_RETURNING:
+                async with db.execute(upsert + " RETURNING id", params) as cur:
+                    row = await cur.fetchone()
+            else:
+                await db.execute(upsert, params)
+                async with db.execute(
+                    "SELECT id FROM mappings WHERE phrase = ? AND file_id = ? AND owner_user_id IS ?",
+                    (phrase, file_id, owner_user_id),
+                ) as cur:
+                    row = await cur.fetchone()
+            await db.commit()
+            self._invalidate_search_cache()
+            return int(row[0])
 
-    async def list_mappings(self, limit: int = 50) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self._db_path) as db:
+    async def list_mappings(self, limit: int = 50) -> List[aiosqlite.Row]:
+        async with self._reader() as db:
             async with db.execute(
-                "SELECT id, phrase, file_id, owner_user_id, owner_username, created_at FROM mappings ORDER BY created_at DESC LIMIT ?",
+                "SELECT id, phrase, file_id, owner_user_id, owner_username, created_at FROM mappings ORDER BY created_at DESC, id DESC LIMIT ?",
                 (int(limit),),
             ) as cur:
-                rows = await cur.fetchall()
-        result: List[Dict[str, Any]] = []
-        for r in rows:
-            result.append(
-                {
-                    "id": r[0],
-                    "phrase": r[1],
-                    "file_id": r[2],
-                    "owner_user_id": r[3],
-                    "owner_username": r[4],
-                    "created_at": r[5],
-                }
-            )
-        return result
+                return list(await cur.fetchall())
 
     async def count_mappings(self) -> int:
-        async with aiosqlite.connect(self._db_path) as db:
+        async with self._reader() as db:
             async with db.execute("SELECT COUNT(1) FROM mappings") as cur:
                 row = await cur.fetchone()
                 return int(row[0]) if row and row[0] is not None else 0
 
-    async def list_mappings_paginated(self, limit: int, offset: int) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self._db_path) as db:
+    async def list_mappings_paginated(self, limit: int, offset: int) -> List[aiosqlite.Row]:
+        async with self._reader() as db:
             async with db.execute(
                 """
                 SELECT id, phrase, file_id, owner_user_id, owner_username, created_at
                 FROM mappings
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT ? OFFSET ?
                 """,
                 (int(limit), int(offset)),
             ) as cur:
-                rows = await cur.fetchall()
-        result: List[Dict[str, Any]] = []
-        for r in rows:
-            result.append(
-                {
-                    "id": r[0],
-                    "phrase": r[1],
-                    "file_id": r[2],
-                    "owner_user_id": r[3],
-                    "owner_username": r[4],
-                    "created_at": r[5],
-                }
-            )
-        return result
+                return list(await cur.fetchall())
 
     # Removed id-based deletion utilities per request; phrase-based deletion remains
 
     async def delete_mappings_by_phrase_if_owner(self, phrase: str, requester_user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self._db_path) as db:
-                cur = await db.execute(
-                    "DELETE FROM mappings WHERE lower(phrase) = lower(?) AND owner_user_id = ?",
-                    (phrase.strip(), int(requester_user_id)),
-                )
-                await db.commit()
-                return int(cur.rowcount)
-
-    @staticmethod
-    def _is_subsequence(needle: str, haystack: str) -> bool:
-        it = iter(haystack)
-        return all(ch in it for ch in needle)
-
-    @staticmethod
-    def _score(query: str, phrase: str) -> int:
-        q = query.lower().strip()
-        p = phrase.lower().strip()
-        if not q or not p:
-            return 0
-        if q == p:
-            return 100
-        if p.startswith(q):
-            return 80
-        if q in p:
-            return 60
-        if Database._is_subsequence(q, p):
-            return 40
-        return 0
-
-    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self._db_path) as db:
-            async with db.execute(
-                "SELECT id, phrase, file_id, owner_user_id, owner_username, created_at FROM mappings",
-            ) as cur:
-                rows = await cur.fetchall()
-        candidates: List[Tuple[int, Dict[str, Any]]] = []
-        for r in rows:
-            item = {
-                "id": r[0],
-                "phrase": r[1],
-                "file_id": r[2],
-                "owner_user_id": r[3],
-                "owner_username": r[4],
-                "created_at": r[5],
-            }
-            score = self._score(query, item["phrase"])
-            if score > 0:
-                candidates.append((score, item))
-
-        candidates.sort(key=lambda t: (t[0], t[1]["created_at"]), reverse=True)
-        return [it for _, it in candidates[: int(limit)]]
-
+        async with self._writing() as db:
+            cur = await db.execute(
+                "DELETE FROM mappings WHERE phrase_lc = ? AND owner_user_id = ?",
+                (_normalize(phrase), int(requester_user_id)),
+            )
+            await db.commit()
+            self._invalidate_search_cache()
+            return int(cur.rowcount)
 
+    async def search(self, query: str, limit: int = 10) -> List[aiosqlite.Row]:
+        q = _normalize(query)
+        if not q:
+            return []
+        key = (q, int(limit))
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            self._search_cache.move_to_end(key)
+            return cached
+        version = self._cache_version
+        match = _fts_query(q)
+        rows = None
+        async with self._reader() as db:
+            if match:
+                try:
+                    async with db.execute(
+                        """
+                        SELECT m.id, m.phrase, m.file_id, m.owner_user_id, m.owner_username, m.created_at
+                        FROM mappings_fts f
+                        JOIN mappings m ON m.id = f.rowid
+                        WHERE mappings_fts MATCH ?
+                        ORDER BY bm25(mappings_fts), m.created_at DESC, m.id DESC
+                        LIMIT ?
+                        """,
+                        (match, int(limit)),
+                    ) as cur:
+                        rows = await cur.fetchall()
+                except sqlite3.OperationalError:
+                    rows = None
+            if rows is None:
+                # Query has no indexable tokens (or FTS rejected it): plain prefix match
+                async with db.execute(
+                    """
+                    SELECT id, phrase, file_id, owner_user_id, owner_username, created_at
+                    FROM mappings
+                    WHERE phrase_lc LIKE ? ESCAPE '\\'
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                    """,
+                    (_like_prefix(q), int(limit)),
+                ) as cur:
+                    rows = await cur.fetchall()
+            if not rows:
+                # Last resort: fuzzy subsequence match, still evaluated inside SQLite
+                async with db.execute(
+                    """
+                    SELECT id, phrase, file_id, owner_user_id, owner_username, created_at
+                    FROM mappings
+                    WHERE phrase_lc LIKE ? ESCAPE '\\'
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                    """,
+                    (_like_subsequence(q), int(limit)),
+                ) as cur:
+                    rows = await cur.fetchall()
+        # A write that landed while we were querying may have made these rows stale
+        if version == self._cache_version:
+            self._search_cache[key] = rows
+            if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return rows